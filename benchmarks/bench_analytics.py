@@ -0,0 +1,70 @@
+"""销售分析引擎性能测试：多终端长期历史的全区间统计耗时与内存
+
+用法: python benchmarks/bench_analytics.py [--days 365] [--terminals 4] [--per-day 2000]
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from gen_sales import generate
+
+
+def peak_rss_mb(children=False):
+    try:
+        import resource
+    except ImportError:
+        return float('nan')  # Windows 无 resource 模块
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    # Linux 上 ru_maxrss 单位为 KB
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def timed(analytics, date_from, date_to, threshold):
+    main.SalesAnalytics.POOL_THRESHOLD = threshold
+    t0 = time.perf_counter()
+    agg = analytics.compute(date_from, date_to)
+    return agg, time.perf_counter() - t0
+
+
+def run():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--terminals', type=int, default=4)
+    parser.add_argument('--per-day', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        paths = generate(tmp, args.days, args.terminals, args.per_day)
+        size = sum(map(os.path.getsize, paths))
+        print(f"生成数据: {args.terminals} 终端 x {args.days} 天 x {args.per_day} 笔, "
+              f"{size / 1e6:.1f} MB, 用时 {time.perf_counter() - t0:.1f} s")
+
+        date_from = '2025-10-01'
+        date_to = (datetime.date(2025, 10, 1) + datetime.timedelta(days=args.days - 1)).isoformat()
+        analytics = main.SalesAnalytics(paths, [], max_workers=args.workers)
+
+        single, t_single = timed(analytics, date_from, date_to, float('inf'))
+        rss_single = peak_rss_mb()
+        pooled, t_pool = timed(analytics, date_from, date_to, 0)
+
+        assert single.records == pooled.records
+        assert round(single.revenue, 2) == round(pooled.revenue, 2)
+        assert single.hour_items == pooled.hour_items and single.daily() == pooled.daily()
+
+        print(f"记录数: {single.records}")
+        print(f"单进程:   {t_single:.2f} s  ({single.records / t_single / 1e6:.2f} M 行/s), 峰值内存 {rss_single:.0f} MB")
+        print(f"进程池({os.cpu_count()} 核): {t_pool:.2f} s  ({pooled.records / t_pool / 1e6:.2f} M 行/s)")
+        print(f"子进程峰值内存 {peak_rss_mb(children=True):.0f} MB (与历史长度无关，可调整 --days 对比)")
+        print("单进程与进程池结果一致")
+
+
+if __name__ == '__main__':
+    run()
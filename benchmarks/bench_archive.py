@@ -0,0 +1,88 @@
+"""销售记录归档性能测试：按天列式归档与原始 CSV 的体积和扫描速度对比
+
+用法: python benchmarks/bench_archive.py [--months 6] [--per-day 2000]
+"""
+import argparse
+import datetime
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from gen_sales import generate
+
+START = '2025-10-01'
+
+
+def timed(func, *args):
+    t0 = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - t0
+
+
+def revenue_from_columns(archives):
+    # 只解压 price / qty 两列
+    cents = 0
+    for path in archives:
+        price, qty = main.SalesArchive(path).read_columns('price', 'qty')
+        cents += sum(p * q for p, q in zip(price, qty))
+    return cents / 100
+
+
+def run():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--months', type=int, default=6)
+    parser.add_argument('--per-day', type=int, default=2000)
+    args = parser.parse_args()
+    days = args.months * 30
+    first = datetime.date.fromisoformat(START)
+    last = (first + datetime.timedelta(days=days - 1)).isoformat()
+    today = (first + datetime.timedelta(days=days)).isoformat()
+    month_from = (first + datetime.timedelta(days=days - 30)).isoformat()
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            generate(tmp, days, terminals=1, per_day=args.per_day, start=START)
+            shutil.copy('sales_record.csv', 'original.csv')
+            csv_size = os.path.getsize('original.csv')
+            main.SalesAnalytics.POOL_THRESHOLD = float('inf')  # 只比较存储格式，不比较并行
+            on_csv = main.SalesAnalytics(['original.csv'], [])
+
+            days_done, t_rotate = timed(main.rotate_sales_file, 'sales_record.csv', today)
+            archives = main.archive_files()
+            archive_size = sum(map(os.path.getsize, archives))
+            on_archive = main.SalesAnalytics([], archives)
+
+            full_csv, t_full_csv = timed(on_csv.compute, START, last)
+            full_arc, t_full_arc = timed(on_archive.compute, START, last)
+            _, t_month_csv = timed(on_csv.compute, month_from, last)
+            _, t_month_arc = timed(on_archive.compute, month_from, last)
+            revenue, t_revenue = timed(revenue_from_columns, archives)
+
+            # 正确性：统计结果一致，归档可逐行还原出原始记录
+            assert full_csv.records == full_arc.records
+            assert round(full_csv.revenue, 2) == round(full_arc.revenue, 2) == round(revenue, 2)
+            assert [(d, q, round(r, 2)) for d, q, r in full_csv.daily()] == \
+                [(d, q, round(r, 2)) for d, q, r in full_arc.daily()]
+            original_rows = list(on_csv.iter_rows(START, last))
+            assert list(on_archive.iter_rows(START, last)) == original_rows
+        finally:
+            os.chdir(cwd)
+
+    print(f"数据: {args.months} 个月 ({days_done} 天) x {args.per_day} 笔/天 = {full_csv.records} 条")
+    print(f"体积: CSV {csv_size / 1e6:.1f} MB, 归档 {archive_size / 1e6:.2f} MB "
+          f"({csv_size / archive_size:.1f}x), 轮转耗时 {t_rotate:.1f} s")
+    print(f"全区间统计: CSV {t_full_csv:.2f} s, 归档 {t_full_arc:.2f} s ({t_full_csv / t_full_arc:.1f}x)")
+    print(f"最近 30 天: CSV {t_month_csv:.2f} s, 归档 {t_month_arc:.3f} s ({t_month_csv / t_month_arc:.1f}x)")
+    print(f"仅营收 (price+qty 两列): {t_revenue:.2f} s")
+    print(f"逐行还原: {len(original_rows)} 条记录与原始 CSV 一致")
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,29 @@
+"""生成模拟的多终端销售记录 (与 sales_record.csv 格式相同)，供性能测试使用"""
+import csv
+import datetime
+import os
+import random
+
+
+def generate(out_dir, days, terminals=1, per_day=2000, start='2025-10-01', products=300, seed=1):
+    """在 out_dir 下生成 sales_record.csv / sales_record_T<n>.csv，返回文件路径列表"""
+    rng = random.Random(seed)
+    catalog = [(f'69{i:06d}', f'商品{i}', round(rng.uniform(1, 50), 1)) for i in range(products)]
+    first_day = datetime.datetime.fromisoformat(start)
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for term in range(terminals):
+        name = 'sales_record.csv' if term == 0 else f'sales_record_T{term}.csv'
+        path = os.path.join(out_dir, name)
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Time', 'Barcode', 'Name', 'Price', 'Quantity'])
+            for day in range(days):
+                base = first_day + datetime.timedelta(days=day)
+                # 营业时间 07:00-23:00，按时间顺序追加
+                for sec in sorted(rng.randint(7 * 3600, 23 * 3600) for _ in range(per_day)):
+                    pid, name_, price = rng.choice(catalog)
+                    t = (base + datetime.timedelta(seconds=sec)).strftime("%Y-%m-%d %H:%M:%S")
+                    writer.writerow([t, pid, name_, price, rng.choice((1, 1, 1, 2, 3))])
+        paths.append(path)
+    return paths
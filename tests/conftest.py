@@ -0,0 +1,32 @@
+import os
+import sys
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import pytest
+from PySide6.QtCore import QTimer
+
+import main
+
+
+@pytest.fixture(scope="session")
+def app():
+    return main.QApplication.instance() or main.QApplication([])
+
+
+def run_until(app, cond, timeout_ms=20000):
+    # 运行事件循环直到条件满足或超时
+    poll = QTimer()
+    poll.timeout.connect(lambda: cond() and app.quit())
+    poll.start(20)
+    deadline = QTimer()
+    deadline.setSingleShot(True)
+    deadline.timeout.connect(app.quit)
+    deadline.start(timeout_ms)
+    app.exec()
+    poll.stop()
+    deadline.stop()
+    return cond()
@@ -0,0 +1,131 @@
+"""报警管理：去重、限流与补发、异步落盘，以及报警风暴下不阻塞数据包处理"""
+import csv
+import time
+
+import pytest
+
+import main
+from conftest import run_until
+
+
+@pytest.fixture
+def center(app):
+    center = main.AlarmCenter()
+    notified = []
+    center.notify_signal.connect(lambda entry, suppressed: notified.append(
+        (entry['level'], entry['msg'], entry['count'], suppressed)))
+    center.notified = notified
+    yield center
+    center.retry_timer.stop()
+
+
+def test_repeats_within_window_are_merged(center):
+    for t in (0, 10, 20):
+        center.report('1', 'Fire_Err', now=t)
+
+    assert len(center.entries) == 1
+    assert center.entries[0]['count'] == 3
+    assert center.notified == [('1', 'Fire_Err', 1, 0)]
+
+
+def test_renotified_after_window(center):
+    for t in (0, 10, 20, 30):
+        center.report('1', 'Fire_Err', now=t)
+    # 停报超过窗口期后再次出现，算作新的一次
+    center.report('1', 'Fire_Err', now=100)
+
+    assert [e['count'] for e in center.entries] == [4, 1]
+    assert center.notified == [('1', 'Fire_Err', 1, 0), ('1', 'Fire_Err', 4, 0),
+                               ('1', 'Fire_Err', 1, 0)]
+
+
+def test_rate_limit_counts_and_delivers_suppressed(center):
+    for t in range(7):
+        center.report('1', f'Err_{t}', now=t)
+
+    assert len(center.notified) == center.MAX_NOTIFY_PER_MIN
+    assert center.suppressed == 2
+    assert center.retry_timer.isActive()
+    assert center.retry_timer.interval() == (0 + center.NOTIFY_PERIOD - 6) * 1000 + 1
+
+    # 最早的提醒滑出统计周期后腾出一个额度，先补发最近出现的一条并告知压下的数量
+    center.flush_pending(now=60)
+    assert center.notified[5:] == [('1', 'Err_6', 1, 2)]
+    center.flush_pending(now=61)
+    assert center.notified[6:] == [('1', 'Err_5', 1, 0)]
+    assert not center.pending and not center.retry_timer.isActive()
+
+
+def test_new_and_higher_level_alarms_go_before_repeats(center):
+    for t in range(4):
+        center.report('1', f'Repeat_{t}', now=t)
+    center.report('3', 'Smoke_Err', now=4)
+    center.report('1', 'New_Err', now=33)
+    center.report('3', 'Smoke_Err', now=34)
+    for t in range(4):
+        center.report('1', f'Repeat_{t}', now=35 + t / 10)
+
+    assert len(center.notified) == 5
+    center.flush_pending(now=60)
+    center.flush_pending(now=61)
+    center.flush_pending(now=62)
+    assert [n[1] for n in center.notified[5:]] == ['New_Err', 'Smoke_Err', 'Repeat_3']
+
+
+def test_suppressed_alarm_is_delivered_by_timer(app, center, monkeypatch):
+    monkeypatch.setattr(main.AlarmCenter, "NOTIFY_PERIOD", 0.2)
+    for i in range(6):
+        center.report('1', f'Err_{i}')
+    assert len(center.notified) == 5
+
+    assert run_until(app, lambda: len(center.notified) == 6, timeout_ms=2000)
+    assert center.notified[5] == ('1', 'Err_5', 1, 1)
+
+
+def test_writer_saves_every_occurrence(app, tmp_path):
+    path = str(tmp_path / 'alarms.csv')
+    writer = main.AlarmWriter(path)
+    writer.start()
+    center = main.AlarmCenter(writer)
+    for i in range(1000):
+        center.report('1', 'Fire_Err' if i % 10 else f'Err_{i}', now=i / 100)
+    writer.stop()
+    center.retry_timer.stop()
+
+    with open(path, encoding='utf-8-sig') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['Time', 'Level', 'Msg']
+    assert len(rows) == 1 + 1000
+    assert sum(r[2] == 'Fire_Err' for r in rows[1:]) == 900
+
+
+def test_alarm_storm_does_not_block_reports(app, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open('products.csv', 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'name', 'price'])
+        writer.writerow(['69000001', '可乐', '3.5'])
+    w = main.MainWindow()
+    assert run_until(app, lambda: w.catalog_ready)
+    notified = []
+    w.alarms.notify_signal.connect(lambda entry, suppressed: notified.append(entry['msg']))
+
+    # 2000 次 Fire_Err 夹杂 20 种其他报警与 100 笔销售上报
+    start = time.perf_counter()
+    for i in range(2000):
+        w.handle_packet({'CMD': 'ALARM', 'LEVEL': '1', 'MSG': 'Fire_Err'})
+        if i % 100 == 0:
+            w.handle_packet({'CMD': 'ALARM', 'LEVEL': '2', 'MSG': f'Sensor_{i // 100}'})
+        if i % 20 == 0:
+            w.handle_packet({'CMD': 'REPORT', 'ID': '69000001', 'QT': '1'})
+    elapsed = time.perf_counter() - start
+    w.close()
+
+    assert elapsed < 2.0
+    assert w.table.rowCount() == 100
+    assert len(w.alarms.entries) == 21
+    assert w.alarms.entries[0]['count'] == 2000
+    assert len(notified) == main.AlarmCenter.MAX_NOTIFY_PER_MIN
+    assert w.alarm_panel is not None and not w.alarm_panel.isModal()
+    with open(main.ALARM_FILE, encoding='utf-8-sig') as f:
+        assert sum(1 for _ in f) == 1 + 2020
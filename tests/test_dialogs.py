@@ -0,0 +1,29 @@
+"""复用的对话框：重新打开时不能沿用上次的选择"""
+import main
+
+
+def catalog(n):
+    return [{'id': f'69{i:06d}', 'name': f'商品{i}', 'price': 1.0} for i in range(n)]
+
+
+def test_reused_scan_dialog_forgets_previous_row(app, monkeypatch):
+    warnings = []
+    monkeypatch.setattr(main.QMessageBox, "warning", staticmethod(lambda *a, **k: warnings.append(a[2])))
+    dialog = main.ScanSimulationDialog(catalog(3))
+    dialog.table.selectRow(1)
+    dialog.select_and_accept()
+    assert dialog.selected_id == '69000001'
+
+    dialog.set_data(catalog(5))
+    assert dialog.table.currentRow() == -1
+    dialog.select_and_accept()
+    assert dialog.selected_id is None
+    assert warnings
+
+
+def test_reused_editor_dialog_resets_current_cell(app):
+    dialog = main.ProductEditorDialog(catalog(3))
+    dialog.table.selectRow(2)
+    dialog.set_data(catalog(2))
+    assert dialog.table.currentRow() == -1
+    assert dialog.table.selectedIndexes() == []
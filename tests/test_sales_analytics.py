@@ -0,0 +1,81 @@
+"""销售分析：进程池结果与单进程一致，统计/导出线程在退出时被等待"""
+import csv
+import time
+
+import pytest
+
+import main
+from conftest import run_until
+from gen_sales import generate
+
+
+@pytest.fixture
+def sales_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    generate(str(tmp_path), days=20, terminals=2, per_day=200)
+    return tmp_path
+
+
+def test_pool_matches_single_process(sales_dir, monkeypatch):
+    analytics = main.SalesAnalytics(max_workers=2)
+    monkeypatch.setattr(main.SalesAnalytics, "CHUNK_SIZE", 64 * 1024)
+    monkeypatch.setattr(main.SalesAnalytics, "POOL_THRESHOLD", float('inf'))
+    single = analytics.compute('2025-10-01', '2025-10-20')
+    monkeypatch.setattr(main.SalesAnalytics, "POOL_THRESHOLD", 0)
+    pooled = analytics.compute('2025-10-01', '2025-10-20')
+
+    assert single.records == pooled.records == 2 * 20 * 200
+    assert single.by_product == pooled.by_product
+    assert single.daily() == pooled.daily()
+    assert single.hour_orders == pooled.hour_orders
+
+
+def test_export_runs_on_worker_thread(app, sales_dir):
+    worker = main.ExportWorker(str(sales_dir / 'out.csv'), '2025-10-05', '2025-10-06')
+    results = []
+    worker.result_signal.connect(lambda count, path: results.append(count))
+    worker.start()
+
+    assert run_until(app, lambda: bool(results))
+    with open(sales_dir / 'out.csv', encoding='utf-8-sig') as f:
+        assert sum(1 for _ in csv.reader(f)) == results[0] + 1 == 2 * 2 * 200 + 1
+
+
+def test_close_waits_for_running_analysis(app, sales_dir, monkeypatch):
+    with open('products.csv', 'w', encoding='utf-8-sig', newline='') as f:
+        csv.writer(f).writerow(['id', 'name', 'price'])
+    compute = main.SalesAnalytics.compute
+
+    def slow_compute(self, *args):
+        time.sleep(0.5)  # 保证关闭窗口时统计仍在进行
+        return compute(self, *args)
+
+    monkeypatch.setattr(main.SalesAnalytics, "compute", slow_compute)
+    w = main.MainWindow()
+    assert run_until(app, lambda: w.catalog_ready)
+    w.analytics_dialog = main.SalesAnalyticsDialog(w.pm, w)
+    w.analytics_dialog.run_analysis()
+    w.analytics_dialog.hide()
+    assert w.analytics_dialog.worker.isRunning()
+
+    w.close()
+    assert not w.analytics_dialog.worker.isRunning()
+
+
+def test_result_describes_the_computed_query(app, sales_dir):
+    dialog = main.SalesAnalyticsDialog(main.ProductManager())
+    dialog.date_from.setDate(main.QDate(2025, 10, 1))
+    dialog.date_to.setDate(main.QDate(2025, 10, 2))
+    dialog.spin_top.setValue(3)
+    dialog.run_analysis()
+    assert not dialog.date_from.isEnabled()
+    assert not dialog.date_to.isEnabled()
+    assert not dialog.spin_top.isEnabled()
+
+    # 运行中输入框被锁定，即使程序修改日期，结果仍描述实际统计的区间
+    dialog.date_to.setDate(main.QDate(2025, 10, 20))
+    assert run_until(app, lambda: dialog.btn_run.isEnabled())
+    assert "2025-10-01 ~ 2025-10-02" in dialog.lbl_summary.text()
+    assert dialog.table_day.rowCount() == 2
+    assert dialog.table_top.rowCount() == 3
+    assert dialog.spin_top.isEnabled() and dialog.date_from.isEnabled()
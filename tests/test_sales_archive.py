@@ -0,0 +1,107 @@
+"""销售记录归档：列式归档可无损还原，轮转可重复执行而不重复计数"""
+import os
+import shutil
+
+import pytest
+
+import main
+from gen_sales import generate
+
+TODAY = '2025-10-06'
+
+
+@pytest.fixture
+def sales_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    generate(str(tmp_path), days=6, terminals=2, per_day=50)
+    with open('sales_record.csv', 'a', encoding='utf-8-sig', newline='') as f:
+        f.write('2025-10-03 12:00:00,69000001,"可,乐",3.5,2\n')  # 不连续的同一天，名称含逗号
+    return tmp_path
+
+
+def all_rows(paths):
+    return sorted(main.SalesAnalytics(paths, main.archive_files()).iter_rows('2000-01-01', '2099-12-31'))
+
+
+def test_archive_round_trip(sales_dir):
+    rows = list(main.SalesAnalytics(['sales_record.csv'], []).iter_rows('2025-10-02', '2025-10-02'))
+    main.write_sales_archive('day.sac', '2025-10-02', rows)
+    archive = main.SalesArchive('day.sac')
+
+    assert list(archive.iter_rows()) == rows
+    price, qty = archive.read_columns('price', 'qty')
+    assert sum(p * q for p, q in zip(price, qty)) == round(sum(r[3] * r[4] * 100 for r in rows))
+
+
+def test_rotation_keeps_today_and_every_row(sales_dir):
+    before = all_rows(main.sales_files())
+    assert main.rotate_sales_file('sales_record.csv', today=TODAY) == 5
+
+    assert all_rows(main.sales_files()) == before
+    remaining = list(main.SalesAnalytics(['sales_record.csv'], []).iter_rows('2000-01-01', '2099-12-31'))
+    assert remaining and all(r[0].startswith(TODAY) for r in remaining)
+
+
+def crash_on(monkeypatch, name, suffix):
+    """让 os.<name> 在处理以 suffix 结尾的文件时抛出一次，模拟进程在该步中断"""
+    real = getattr(os, name)
+    fired = []
+
+    def fake(src, *args):
+        if not fired and src.endswith(suffix):
+            fired.append(src)
+            raise RuntimeError("模拟进程中断")
+        return real(src, *args)
+
+    monkeypatch.setattr(os, name, fake)
+    return real
+
+
+@pytest.mark.parametrize("crash", ["archive", "remove-rotating", "replace-path", "remove-done"])
+def test_interrupted_rotation_is_not_double_counted(sales_dir, monkeypatch, crash):
+    before = all_rows(main.sales_files())
+    write = main.write_sales_archive
+    calls = []
+
+    def crash_after_two(*args, **kwargs):
+        if len(calls) == 2:
+            raise RuntimeError("模拟进程中断")
+        calls.append(args[1])
+        write(*args, **kwargs)
+
+    if crash == "archive":
+        monkeypatch.setattr(main, "write_sales_archive", crash_after_two)
+    elif crash == "remove-rotating":
+        crash_on(monkeypatch, "remove", ".rotating")
+    elif crash == "replace-path":
+        crash_on(monkeypatch, "replace", ".tmp")
+    else:
+        crash_on(monkeypatch, "remove", ".done")
+    with pytest.raises(RuntimeError):
+        main.rotate_sales_file('sales_record.csv', today=TODAY)
+    monkeypatch.undo()
+    monkeypatch.chdir(sales_dir)
+
+    # 重启后、再次轮转前又记了一笔
+    sale = f'{TODAY} 18:00:00,69000002,补录,1.5,1\n'
+    with open('sales_record.csv', 'a', encoding='utf-8-sig', newline='') as f:
+        f.write(sale)
+    before = sorted(before + [main.parse_sale_line(sale)])
+
+    main.rotate_sales_file('sales_record.csv', today=TODAY)
+
+    for leftover in ('.rotating', '.tmp', '.done'):
+        assert not os.path.exists('sales_record.csv' + leftover)
+    assert all_rows(main.sales_files()) == before
+
+
+def test_recopied_terminal_file_is_not_double_counted(sales_dir):
+    shutil.copy('sales_record_T1.csv', 'T1_full_copy.csv')
+    main.rotate_sales_file('sales_record_T1.csv', today=TODAY)
+    expected = all_rows(main.sales_files())
+
+    # 其他终端再次拷贝来包含全部历史的完整文件
+    shutil.copy('T1_full_copy.csv', 'sales_record_T1.csv')
+    main.rotate_sales_file('sales_record_T1.csv', today=TODAY)
+
+    assert all_rows(main.sales_files()) == expected
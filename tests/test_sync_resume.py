@@ -0,0 +1,231 @@
+"""断线续传测试：模拟会随机断线的下位机，驱动 MainWindow 的同步流程"""
+import csv
+import os
+import random
+
+import pytest
+from PySide6.QtCore import QObject, QTimer, Signal
+
+import main
+from conftest import run_until
+
+
+class FakeDevice:
+    """下位机 Flash 状态，断线后保留 (模拟掉线但未断电)"""
+    def __init__(self, legacy=False, forget=False):
+        self.legacy = legacy      # 旧固件：不带 SID，不回复 ACK/RESUME
+        self.forget = forget      # 不认识任何旧会话 (换了设备)，SYNC_RESUME 一律拒绝
+        self.flash = []
+        self.sid = None
+        self.dg = None
+        self.valid = False
+        self.erases = 0
+        self.writes = 0
+
+
+class FakeWorker(QObject):
+    """替换 SerialWorker：发送的指令直接交给 FakeDevice 处理，按概率断线"""
+    log_signal = Signal(str)
+    packet_signal = Signal(dict)
+    connection_success_signal = Signal(bool)
+    link_lost_signal = Signal()
+
+    def __init__(self, device, p_drop=0.0, reconnect=True):
+        super().__init__()
+        self.dev = device
+        self.p_drop = p_drop
+        self.reconnect = reconnect
+        self.is_running = False
+        self.drops = 0
+        self.events = []          # 按顺序记录发出的指令 (CMD 名称)
+
+    def start_serial(self, port=None, baud=None):
+        self.is_running = True
+        QTimer.singleShot(0, lambda: self.connection_success_signal.emit(True))
+
+    def stop(self):
+        self.is_running = False
+
+    def wait(self):
+        pass
+
+    def deliver(self, data):
+        if self.is_running:
+            self.packet_signal.emit(data)
+
+    def reply(self, cmd, **fields):
+        data = {'CMD': cmd}
+        data.update({k: str(v) for k, v in fields.items()})
+        QTimer.singleShot(1, lambda: self.deliver(data))
+
+    def send(self, text):
+        if not self.is_running:
+            return False
+        if random.random() < self.p_drop:
+            # 断线：本条丢失，稍后自动重连
+            self.is_running = False
+            self.drops += 1
+            QTimer.singleShot(0, self.link_lost_signal.emit)
+            if self.reconnect:
+                QTimer.singleShot(20, self.start_serial)
+            return False
+        d = dict(part.split(':', 1) for part in text.split(','))
+        self.events.append(d['CMD'])
+        self.handle(d)
+        return True
+
+    def handle(self, d):
+        dev = self.dev
+        cmd = d['CMD']
+        if cmd == 'SYNC_START':
+            dev.erases += 1
+            dev.flash = []
+            dev.valid = False
+            if dev.legacy:
+                self.reply('REQ_SYNC')
+            else:
+                dev.sid, dev.dg = d['SID'], d['DG']
+                self.reply('REQ_SYNC', SID=dev.sid, IDX=0)
+        elif cmd == 'SYNC_RESUME':
+            if dev.legacy:
+                return
+            if not dev.forget and dev.sid == d['SID'] and dev.dg == d['DG']:
+                self.reply('REQ_SYNC', SID=dev.sid, IDX=len(dev.flash))
+            else:
+                self.reply('SYNC_REJECT', SID=d['SID'])
+        elif cmd == 'SYNC_DATA':
+            rec = (d['ID'], d['PR'], d['NM'])
+            if dev.legacy:
+                dev.flash.append(rec)
+                dev.writes += 1
+                return
+            if d['SID'] == dev.sid and int(d['IDX']) == len(dev.flash):
+                dev.flash.append(rec)
+                dev.writes += 1
+            # 偶尔丢失 ACK，由超时重新握手兜底
+            if random.random() < 0.9:
+                self.reply('SYNC_ACK', SID=dev.sid, IDX=len(dev.flash))
+        elif cmd == 'SYNC_END':
+            if int(d['SUM']) == len(dev.flash):
+                dev.valid = True
+                if not dev.legacy:
+                    self.reply('SYNC_DONE', SID=dev.sid)
+
+
+@pytest.fixture
+def window(app, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(main, "SYNC_INTERVAL_MS", 1)
+    monkeypatch.setattr(main, "SYNC_STALL_TIMEOUT_MS", 300)
+    monkeypatch.setattr(main.QMessageBox, "information", staticmethod(lambda *a, **k: None))
+    with open('products.csv', 'w', encoding='utf-8-sig', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['id', 'name', 'price'])
+        for i in range(60):
+            writer.writerow([f'69{i:06d}', f'商品{i}', f'{i % 20}.5'])
+    w = main.MainWindow()
+    yield w
+    w.close()
+
+
+def attach(w, worker):
+    w.worker = worker
+    worker.log_signal.connect(w.append_log)
+    worker.packet_signal.connect(w.handle_packet)
+    worker.connection_success_signal.connect(w.handle_connection_status)
+    worker.link_lost_signal.connect(w.handle_link_lost)
+
+
+def expected_flash(w):
+    return [(item['id'], str(item['price']), item['name']) for item in w.pm.get_all_list()]
+
+
+@pytest.mark.parametrize("seed,p_drop", [(0, 0.02), (1, 0.05), (2, 0.1), (3, 0.2)])
+def test_resume_after_random_link_drops(app, window, seed, p_drop):
+    random.seed(seed)
+    dev = FakeDevice()
+    worker = FakeWorker(dev)
+    attach(window, worker)
+    assert run_until(app, lambda: window.catalog_ready)
+
+    worker.is_running = True
+    worker.p_drop = p_drop
+    window.start_sync_phase1()
+    done = run_until(app, lambda: dev.valid and not window.is_syncing
+                     and not os.path.exists(main.SyncSession.CHECKPOINT_FILE))
+
+    assert done
+    assert worker.drops > 0
+    assert dev.erases == 1
+    assert dev.writes == len(dev.flash) == 60
+    assert dev.flash == expected_flash(window)
+
+
+def test_legacy_firmware_full_sync(app, window):
+    dev = FakeDevice(legacy=True)
+    worker = FakeWorker(dev)
+    attach(window, worker)
+    assert run_until(app, lambda: window.catalog_ready)
+
+    worker.is_running = True
+    window.start_sync_phase1()
+
+    assert run_until(app, lambda: dev.valid and not window.is_syncing)
+    assert dev.erases == 1
+    assert dev.flash == expected_flash(window)
+
+
+@pytest.mark.parametrize("device", [FakeDevice(forget=True), FakeDevice(legacy=True)],
+                         ids=["reject", "no-answer"])
+def test_unresumable_checkpoint_asks_before_erase(app, window, monkeypatch, device):
+    asked = []
+    monkeypatch.setattr(main.QMessageBox, "question",
+                        staticmethod(lambda *a, **k: asked.append(a[2]) or main.QMessageBox.No))
+    run_until(app, lambda: window.catalog_ready)
+    main.SyncSession(window.pm.get_all_list()).save_checkpoint()
+
+    worker = FakeWorker(device)
+    attach(window, worker)
+    worker.start_serial()
+
+    assert run_until(app, lambda: bool(asked))
+    assert device.erases == 0
+    assert not window.is_syncing
+    assert not os.path.exists(main.SyncSession.CHECKPOINT_FILE)
+
+
+@pytest.mark.parametrize("answer", ["Yes", "No"])
+def test_changed_catalog_drops_checkpoint_and_asks(app, window, monkeypatch, answer):
+    run_until(app, lambda: window.catalog_ready)
+    main.SyncSession(window.pm.get_all_list()).save_checkpoint()
+
+    # 断线期间修改了商品库
+    with open('products.csv', 'a', encoding='utf-8-sig', newline='') as f:
+        csv.writer(f).writerow(['69999999', '新商品', '9.9'])
+    window.pm.load_data()
+
+    dev = FakeDevice()
+    worker = FakeWorker(dev)
+    reply = getattr(main.QMessageBox, answer)
+    checkpoint_at_ask = []
+
+    def ask(*args, **kwargs):
+        worker.events.append('ASK')
+        checkpoint_at_ask.append(os.path.exists(main.SyncSession.CHECKPOINT_FILE))
+        return reply
+
+    monkeypatch.setattr(main.QMessageBox, "question", staticmethod(ask))
+    attach(window, worker)
+    worker.start_serial()
+
+    assert run_until(app, lambda: 'ASK' in worker.events)
+    assert 'SYNC_RESUME' not in worker.events
+    assert checkpoint_at_ask == [False]
+    if answer == "Yes":
+        assert worker.events[:2] == ['ASK', 'SYNC_START']
+        assert run_until(app, lambda: dev.valid and not window.is_syncing)
+        assert dev.flash == expected_flash(window)
+    else:
+        assert worker.events == ['ASK']
+        assert not os.path.exists(main.SyncSession.CHECKPOINT_FILE)
+    assert dev.erases == (1 if answer == "Yes" else 0)